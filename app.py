@@ -18,10 +18,13 @@
 import os
 import sys
 import json
+import re
 import logging
 import argparse
+import itertools
 import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from pathlib import Path
 from typing import Dict, List, Optional, Any
@@ -31,12 +34,12 @@ from utils import (
     get_paths, ensure_secret_key, encrypt_data, decrypt_data,
     get_cached_data, set_cached_data, clear_cache,
     acquire_lock, release_lock, replace_placeholders, _format_task_strings,
-    fetch_api_data, fetch_all_api_data, generate_excel_file_with_sheets,
+    fetch_api_records, fetch_all_api_data, generate_excel_file_with_sheets,
     register_scheduled_task, get_task_status, enable_scheduled_task,
     disable_scheduled_task, delete_scheduled_task, get_scheduled_tasks,
     set_logger, send_email, generate_excel_file, load_config, save_config,
     get_task_config, add_task_config, execute_task, unregister_scheduled_task,
-    run_headless, DEFAULT_CONFIG_TEMPLATE, TASK_TEMPLATE
+    run_headless_batch, DEFAULT_CONFIG_TEMPLATE, new_task_config
 )
 
 # 导入GUI相关（可选，如果安装了CustomTkinter）
@@ -58,6 +61,28 @@ CONFIG_FILE = EXTERNAL_DIR / "config.json"
 SECRET_KEY_FILE = INTERNAL_DIR / "secret.key"
 LOG_FILE = EXTERNAL_DIR / "app.log"
 
+# 后台工作线程池：schtasks等阻塞调用放到这里执行，避免卡住GUI主循环
+_WORKER_POOL = ThreadPoolExecutor(max_workers=2)
+
+# 邮箱地址列表的分隔符：逗号、分号（含全角）或空白
+_ADDR_SPLIT_RE = re.compile(r"[,;，；\s]+")
+# 只做基本格式校验，不合格的地址保留原样并提示用户
+_ADDR_VALID_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+def _parse_addresses(text: str):
+    """拆分邮箱地址列表，去掉两侧引号，返回(地址列表, 格式不正确的地址列表)"""
+    addresses = [part.strip("'\"") for part in _ADDR_SPLIT_RE.split(text)]
+    addresses = [addr for addr in addresses if addr]
+    invalid = [addr for addr in addresses if not _ADDR_VALID_RE.fullmatch(addr)]
+    return addresses, invalid
+
+# 任务列表每批创建的任务卡片数量
+TASK_CARD_CHUNK_SIZE = 10
+
+# 星期代码（schtasks格式）及对应的界面显示名称
+_WEEKDAY_CODES = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+_WEEKDAY_LABELS = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
 # ==================== 内置默认配置 ====================
 # 配置常量已移至 utils.py
 
@@ -104,7 +129,7 @@ if GUI_AVAILABLE:
         def __init__(self, parent, task_config=None):
             super().__init__(parent)
             self.parent = parent
-            self.task_config = task_config or TASK_TEMPLATE.copy()
+            self.task_config = task_config or new_task_config()
             self.preview_df = None # 用于存储预览数据
             self.title("任务配置向导" if not task_config else "编辑任务")
             self.geometry("800x650")  # 增加高度确保底部按钮显示完整
@@ -345,10 +370,15 @@ if GUI_AVAILABLE:
                 api_config["headers"] = headers
 
             try:
-                # 不使用缓存进行API测试
-                df = fetch_api_data(self.task_config, current_tab, use_cache=False)
-                if df is not None:
-                    CTkMessagebox(title="测试成功", message=f"API {current_tab} 连接成功，获取到 {len(df)} 行数据", icon="check")
+                # 只统计返回的记录数，不构建DataFrame
+                records = fetch_api_records(api_config)
+                if records is not None:
+                    max_records = api_config.get("max_records", 100000)
+                    try:
+                        record_count = sum(1 for _ in itertools.islice(records, max_records))
+                    finally:
+                        records.close()  # islice提前停止时关闭流式响应
+                    CTkMessagebox(title="测试成功", message=f"API {current_tab} 连接成功，获取到 {record_count} 行数据", icon="check")
                 else:
                     CTkMessagebox(title="测试失败", message=f"API {current_tab} 连接失败，请检查配置", icon="cancel")
             except Exception as e:
@@ -735,8 +765,10 @@ if GUI_AVAILABLE:
                         self.task_config["email_config"]["sender"]["password"] = ""
                         self.stored_password = ""  # 清空存储的密码
 
-                to_list = [email.strip() for email in self.to_entry.get().split(",") if email.strip()]
-                cc_list = [email.strip() for email in self.cc_entry.get().split(",") if email.strip()]
+                to_list, invalid_to = _parse_addresses(self.to_entry.get())
+                cc_list, invalid_cc = _parse_addresses(self.cc_entry.get())
+                if invalid_to or invalid_cc:
+                    CTkMessagebox(title="提示", message=f"以下邮箱地址格式可能不正确，请检查: {', '.join(invalid_to + invalid_cc)}", icon="warning")
 
                 self.task_config["email_config"]["recipients"]["to"] = to_list
                 self.task_config["email_config"]["recipients"]["cc"] = cc_list
@@ -1004,6 +1036,9 @@ if GUI_AVAILABLE:
             ctk.set_appearance_mode("light")
             ctk.set_default_color_theme("blue")
 
+            # 任务列表刷新批次号，用于丢弃过期的分批构建
+            self._task_list_generation = 0
+
             self.setup_ui()
             self.refresh_task_list()
 
@@ -1069,9 +1104,13 @@ if GUI_AVAILABLE:
             self.schedule_btn.configure(state="disabled")
             self.delete_btn.configure(state="disabled")
 
+            # 作废尚未执行的旧批次，即使本次列表为空也不能让它们继续添加卡片
+            self._task_list_generation += 1
+            generation = self._task_list_generation
+
             # 获取任务列表
             config = load_config()
-            tasks = config.get("tasks", [])
+            tasks = list(config.get("tasks", {}).values())
 
             if not tasks:
                 # 显示空状态
@@ -1079,9 +1118,16 @@ if GUI_AVAILABLE:
                 empty_label.pack(expand=True)
                 return
 
-            # 显示任务卡片
-            for task in tasks:
-                self.create_task_card(task)
+            # 分批创建任务卡片，批次之间让出事件循环，任务较多时界面不会卡顿
+            def build_chunk(start):
+                if generation != self._task_list_generation:
+                    return  # 列表已被再次刷新，放弃本次构建
+                for task in tasks[start:start + TASK_CARD_CHUNK_SIZE]:
+                    self.create_task_card(task)
+                if start + TASK_CARD_CHUNK_SIZE < len(tasks):
+                    self.after_idle(build_chunk, start + TASK_CARD_CHUNK_SIZE)
+
+            build_chunk(0)
 
         def create_task_card(self, task):
             """创建任务卡片"""
@@ -1196,8 +1242,8 @@ if GUI_AVAILABLE:
         def new_task(self):
             """新建任务"""
             # 创建新任务配置
-            new_task = TASK_TEMPLATE.copy()
-            new_task["name"] = f"新任务_{len(load_config().get('tasks', [])) + 1}"
+            new_task = new_task_config()
+            new_task["name"] = f"新任务_{len(load_config().get('tasks', {})) + 1}"
 
             # 打开配置向导
             wizard = TaskConfigWizard(self, new_task)
@@ -1330,22 +1376,25 @@ if GUI_AVAILABLE:
             dialog.geometry("400x300")
             dialog.transient(self)
             dialog.grab_set()
+            # 使用grid布局：grid_remove会保留行列信息，显示/隐藏星期选择时无需重新排布整个弹窗
+            dialog.grid_columnconfigure(0, weight=1)
+            dialog.grid_rowconfigure(5, weight=1)
 
             # 频率选择
-            CTkLabel(dialog, text="执行频率:", font=("微软雅黑", 12, "bold")).pack(anchor="w", padx=20, pady=10)
+            CTkLabel(dialog, text="执行频率:", font=("微软雅黑", 12, "bold")).grid(row=0, column=0, sticky="w", padx=20, pady=10)
 
             frequency_var = ctk.StringVar(value=task["schedule_config"].get("frequency", "DAILY"))
             frequency_frame = CTkFrame(dialog)
-            frequency_frame.pack(fill="x", padx=20, pady=5)
+            frequency_frame.grid(row=1, column=0, sticky="ew", padx=20, pady=5)
 
             CTkRadioButton(frequency_frame, text="每天", variable=frequency_var, value="DAILY").pack(side="left", padx=5)
             CTkRadioButton(frequency_frame, text="每周", variable=frequency_var, value="WEEKLY").pack(side="left", padx=5)
 
             # 时间选择
-            CTkLabel(dialog, text="执行时间:", font=("微软雅黑", 12, "bold")).pack(anchor="w", padx=20, pady=10)
+            CTkLabel(dialog, text="执行时间:", font=("微软雅黑", 12, "bold")).grid(row=2, column=0, sticky="w", padx=20, pady=10)
 
             time_frame = CTkFrame(dialog)
-            time_frame.pack(fill="x", padx=20, pady=5)
+            time_frame.grid(row=3, column=0, sticky="ew", padx=20, pady=5)
 
             hour_var = ctk.StringVar(value=task["schedule_config"].get("time", "18:00").split(":")[0])
             minute_var = ctk.StringVar(value=task["schedule_config"].get("time", "18:00").split(":")[1])
@@ -1360,14 +1409,13 @@ if GUI_AVAILABLE:
 
             # 星期选择（仅当频率为每周时显示）
             week_frame = CTkFrame(dialog)
-            week_frame.pack(fill="x", padx=20, pady=5)
+            week_frame.grid(row=4, column=0, sticky="ew", padx=20, pady=5)
 
             days_var = []
             days_frame = CTkFrame(week_frame)
             days_frame.pack(fill="x", pady=5)
 
-            day_names = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-            for i, day_name in enumerate(day_names):
+            for i, day_name in enumerate(_WEEKDAY_LABELS):
                 var = ctk.BooleanVar()
                 cb = CTkCheckBox(days_frame, text=day_name, variable=var)
                 cb.grid(row=i//4, column=i%4, padx=2, pady=2)
@@ -1379,16 +1427,52 @@ if GUI_AVAILABLE:
             def update_week_visibility():
                 """根据频率显示/隐藏星期选择"""
                 if frequency_var.get() == "WEEKLY":
-                    week_frame.pack(fill="x", padx=20, pady=5)
+                    week_frame.grid()
                 else:
-                    week_frame.pack_forget()
+                    week_frame.grid_remove()
 
-            frequency_var.trace('w', lambda *args: update_week_visibility())
+            frequency_var.trace_add('write', lambda *args: update_week_visibility())
             update_week_visibility()
 
+            # 注册进度条（后台注册期间显示）
+            progress_bar = CTkProgressBar(dialog, mode="indeterminate")
+            progress_bar.grid(row=5, column=0, sticky="sew", padx=20)
+            progress_bar.grid_remove()
+
             # 按钮
             button_frame = CTkFrame(dialog)
-            button_frame.pack(side="bottom", pady=20)
+            button_frame.grid(row=6, column=0, pady=20)
+
+            def on_registered(future, frequency):
+                """后台注册完成后的回调（在主线程中执行）"""
+                try:
+                    success = future.result()
+                except Exception as e:
+                    logger.error(f"注册定时任务时出错: {e}")
+                    success = False
+
+                if success:
+                    add_task_config(task)
+
+                # 注册期间主窗口或弹窗可能已被关闭，不能再访问已销毁的控件
+                if not self.winfo_exists():
+                    return
+                if not dialog.winfo_exists():
+                    if success:
+                        self.refresh_task_list()
+                    return
+
+                progress_bar.stop()
+                progress_bar.grid_remove()
+                confirm_btn.configure(state="normal", text="确定")
+
+                frequency_text = "每周" if frequency == "WEEKLY" else "每日"
+                if success:
+                    CTkMessagebox(title="成功", message=f"已注册任务 '{task['name']}' 的{frequency_text}定时计划", icon="check")
+                    dialog.destroy()
+                    self.refresh_task_list()
+                else:
+                    CTkMessagebox(title="失败", message=f"注册{frequency_text}定时任务失败", icon="cancel")
 
             def save_schedule():
                 """保存定时配置并注册任务"""
@@ -1399,61 +1483,69 @@ if GUI_AVAILABLE:
                     minute = minute_var.get()
                     time_str = f"{hour}:{minute}"
 
-                    # 更新任务配置
-                    task["schedule_config"]["enabled"] = True
-                    task["schedule_config"]["frequency"] = frequency
-                    task["schedule_config"]["time"] = time_str
-
+                    days_str = None
                     if frequency == "WEEKLY":
                         selected_days_indices = [i for i, var in enumerate(days_var) if var.get()]
                         if not selected_days_indices:
                             CTkMessagebox(title="错误", message="请选择至少一个星期几", icon="warning")
                             return
 
-                        day_names = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
-                        days_str = ",".join([day_names[i] for i in selected_days_indices])
+                        days_str = ",".join(_WEEKDAY_CODES[i] for i in selected_days_indices)
 
-                        success = register_scheduled_task(task["name"], frequency, time_str, days_str)
-                        if success:
-                            add_task_config(task)
-                            CTkMessagebox(title="成功", message=f"已注册任务 '{task['name']}' 的每周定时计划", icon="check")
-                            dialog.destroy()
-                            self.refresh_task_list()
-                        else:
-                            CTkMessagebox(title="失败", message="注册每周定时任务失败", icon="cancel")
-                    else:  # DAILY
-                        success = register_scheduled_task(task["name"], frequency, time_str)
-                        if success:
-                            add_task_config(task)
-                            CTkMessagebox(title="成功", message=f"已注册任务 '{task['name']}' 的每日定时计划", icon="check")
-                            dialog.destroy()
-                            self.refresh_task_list()
-                        else:
-                            CTkMessagebox(title="失败", message="注册每日定时任务失败", icon="cancel")
+                    # 更新任务配置
+                    task["schedule_config"]["enabled"] = True
+                    task["schedule_config"]["frequency"] = frequency
+                    task["schedule_config"]["time"] = time_str
+
+                    # 在后台线程中注册，完成后回到主线程处理结果
+                    confirm_btn.configure(state="disabled", text="注册中...")
+                    progress_bar.grid()
+                    progress_bar.start()
+
+                    future = _WORKER_POOL.submit(register_scheduled_task, task["name"], frequency, time_str, days_str)
+                    future.add_done_callback(lambda fut: self.after(0, on_registered, fut, frequency))
 
                 except Exception as e:
                     CTkMessagebox(title="错误", message=f"注册定时任务时出错: {e}", icon="cancel")
 
-            CTkButton(button_frame, text="取消", command=dialog.destroy, width=80).pack(side="left", padx=10)
-            CTkButton(button_frame, text="确定", command=save_schedule, fg_color="green", width=80).pack(side="left", padx=10)
+            def close_dialog():
+                """关闭弹窗前先停止进度条动画，避免其定时回调访问已销毁的控件"""
+                progress_bar.stop()
+                dialog.destroy()
+
+            dialog.protocol("WM_DELETE_WINDOW", close_dialog)
+            CTkButton(button_frame, text="取消", command=close_dialog, width=80).pack(side="left", padx=10)
+            confirm_btn = CTkButton(button_frame, text="确定", command=save_schedule, fg_color="green", width=80)
+            confirm_btn.pack(side="left", padx=10)
 
         def delete_task(self, task):
             """删除任务"""
             msg = CTkMessagebox(title="确认删除", message=f"确定要删除任务 '{task['name']}' 吗？", icon="question", option_1="否", option_2="是")
             if msg.get() == "是":
-                try:
+                def remove_schedule():
                     # 如果有定时任务，先删除Windows中的定时任务
                     if task["schedule_config"]["enabled"]:
                         delete_scheduled_task(task["name"])
 
-                    config = load_config()
-                    config["tasks"] = [t for t in config["tasks"] if t["name"] != task["name"]]
-                    save_config(config)
+                # schtasks调用放到后台线程，完成后回到主线程更新配置和界面
+                self.delete_btn.configure(state="disabled")
+                future = _WORKER_POOL.submit(remove_schedule)
+                future.add_done_callback(lambda fut: self.after(0, self.on_task_deleted, task, fut))
 
-                    CTkMessagebox(title="删除成功", message="任务已删除", icon="check")
-                    self.refresh_task_list()
-                except Exception as e:
-                    CTkMessagebox(title="删除失败", message=f"删除任务失败: {e}", icon="cancel")
+        def on_task_deleted(self, task, future):
+            """后台删除定时任务完成后的回调（在主线程中执行）"""
+            try:
+                future.result()
+
+                config = load_config()
+                config["tasks"].pop(task["name"], None)
+                save_config(config)
+
+                CTkMessagebox(title="删除成功", message="任务已删除", icon="check")
+                self.refresh_task_list()
+            except Exception as e:
+                self.delete_btn.configure(state="normal")
+                CTkMessagebox(title="删除失败", message=f"删除任务失败: {e}", icon="cancel")
 
     def show_gui():
         """显示GUI界面"""
@@ -1486,7 +1578,7 @@ def show_first_time_setup():
 def main():
     """主程序入口"""
     parser = argparse.ArgumentParser(description="百川数据助手")
-    parser.add_argument("--headless", type=str, help="Headless模式，指定任务名")
+    parser.add_argument("--headless", type=str, nargs="+", help="Headless模式，指定任务名（可指定多个，并行执行）")
     parser.add_argument("--test-task", type=str, help="测试指定任务")
     parser.add_argument("--list-tasks", action="store_true", help="列出所有任务")
     parser.add_argument("--register-task", type=str, help="注册定时任务")
@@ -1532,9 +1624,10 @@ def main():
     if args.headless:
         # Headless模式
         try:
-            logger.info(f"Headless模式启动，执行任务: {args.headless}")
-            result = run_headless(args.headless)
-            logger.info(f"Headless任务 {args.headless} 完成，返回码: {result}")
+            task_names = ", ".join(args.headless)
+            logger.info(f"Headless模式启动，执行任务: {task_names}")
+            result = run_headless_batch(args.headless)
+            logger.info(f"Headless任务 {task_names} 完成，返回码: {result}")
             return result
         except Exception as e:
             logger.error(f"Headless任务执行失败: {e}")
@@ -1559,10 +1652,10 @@ def main():
         # 列出任务
         try:
             config = load_config()
-            tasks = config.get("tasks", [])
+            tasks = config.get("tasks", {})
             print("当前配置的任务:")
-            for task in tasks:
-                print(f"  - {task['name']}")
+            for task_name in tasks:
+                print(f"  - {task_name}")
             logger.info(f"列出任务成功，共 {len(tasks)} 个任务")
             return 0
         except Exception as e:
@@ -1619,7 +1712,7 @@ def main():
             print("\nGUI功能需要安装CustomTkinter:")
             print("pip install customtkinter")
             print("\n使用方法:")
-            print("  --headless <任务名>     : Headless模式运行指定任务")
+            print("  --headless <任务名> ... : Headless模式运行指定任务（多个任务并行执行）")
             print("  --list-tasks           : 列出所有任务")
             print("  --register-task <任务名> : 注册定时任务")
             print("  --unregister-task <任务名> : 注销定时任务")
@@ -12,7 +12,7 @@ a = Analysis(
         ('secret.key', '.'),
         ('utils.py', '.'),
     ],
-    hiddenimports=['customtkinter', 'pandas', 'openpyxl', 'tkinter', 'requests', 'cryptography', 'CTkMessagebox', 'numpy'],
+    hiddenimports=['customtkinter', 'pandas', 'xlsxwriter', 'tkinter', 'requests', 'cryptography', 'CTkMessagebox', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -10,18 +10,59 @@
 
 import os
 import sys
+import copy
+import itertools
 import time
 import json
+import math
+import re
 import subprocess
+import tempfile
+import threading
+import weakref
 import pandas as pd
 import requests
 import ijson
+import xlsxwriter
+from collections import OrderedDict
+from cryptography.fernet import Fernet
 from io import BytesIO
-from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from decimal import Decimal
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from numbers import Number
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from string import Template
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple
+from urllib3.util.retry import Retry
+from xml.sax.saxutils import escape as xml_escape
+
+# JSON流式解析后端：优先使用C实现的yajl2（比纯Python后端快一个数量级），不可用时依次回退
+for _IJSON_BACKEND_NAME in ('yajl2_c', 'yajl2_cffi', 'python'):
+    try:
+        _IJSON_BACKEND = ijson.get_backend(_IJSON_BACKEND_NAME)
+        break
+    except ImportError:
+        continue
+
+# 可选依赖：安装了pyarrow时，流式批次数据以Arrow列式表构建和合并
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# 可选依赖：安装了pywin32时通过任务计划COM接口管理定时任务，无需每次启动schtasks进程
+try:
+    import pythoncom
+    import win32com.client
+except ImportError:
+    win32com = None
 
 # ==================== 路径管理 ====================
+@lru_cache(maxsize=1)
 def get_paths():
     """获取应用相关路径"""
     if getattr(sys, 'frozen', False):
@@ -36,94 +77,172 @@ def get_paths():
     return INTERNAL_DIR, EXTERNAL_DIR
 
 # ==================== 加密工具 ====================
+# 密钥在进程内只从磁盘读取一次
+_KEY_CACHE: Optional[bytes] = None
+
 def ensure_secret_key():
     """确保加密密钥存在，不存在则生成"""
-    _, EXTERNAL_DIR = get_paths()
+    global _KEY_CACHE
+    if _KEY_CACHE is None:
+        _KEY_CACHE = _load_or_create_secret_key()
+    return _KEY_CACHE
+
+def _load_or_create_secret_key() -> bytes:
+    """读取密钥文件，不存在则生成"""
     INTERNAL_DIR, _ = get_paths()
     SECRET_KEY_FILE = INTERNAL_DIR / "secret.key"
 
-    if not SECRET_KEY_FILE.exists():
-        # 如果是打包环境，密钥应该在exe中，这里生成一个临时的
-        if getattr(sys, 'frozen', False):
-            from cryptography.fernet import Fernet
-            key = Fernet.generate_key()
-            # 在打包环境中，密钥文件在临时目录，不需要设置隐藏属性
-            SECRET_KEY_FILE.write_bytes(key)
-            logger.info("在打包环境中生成临时加密密钥")
-            return key
-        else:
-            # 非打包环境，按原逻辑处理
-            from cryptography.fernet import Fernet
-            key = Fernet.generate_key()
-            SECRET_KEY_FILE.write_bytes(key)
-            # 设置隐藏属性
-            subprocess.run(['attrib', '+H', str(SECRET_KEY_FILE)], shell=True)
-            logger.info("生成新的加密密钥")
-            return key
-    return SECRET_KEY_FILE.read_bytes()
+    try:
+        return SECRET_KEY_FILE.read_bytes()
+    except FileNotFoundError:
+        pass
+
+    # 如果是打包环境，密钥应该在exe中，这里生成一个临时的
+    if getattr(sys, 'frozen', False):
+        key = Fernet.generate_key()
+        # 在打包环境中，密钥文件在临时目录，不需要设置隐藏属性
+        SECRET_KEY_FILE.write_bytes(key)
+        logger.info("在打包环境中生成临时加密密钥")
+        return key
+    else:
+        # 非打包环境，按原逻辑处理
+        key = Fernet.generate_key()
+        SECRET_KEY_FILE.write_bytes(key)
+        # 设置隐藏属性
+        _hide_path(SECRET_KEY_FILE)
+        logger.info("生成新的加密密钥")
+        return key
+
+@lru_cache(maxsize=1)
+def _fernet():
+    """获取复用的Fernet实例，避免每次加解密都重新派生子密钥"""
+    return Fernet(ensure_secret_key())
 
 def encrypt_data(data: str) -> str:
     """加密数据"""
-    from cryptography.fernet import Fernet
-    key = ensure_secret_key()
-    fernet = Fernet(key)
-    encrypted = fernet.encrypt(data.encode())
+    encrypted = _fernet().encrypt(data.encode())
     return encrypted.decode()
 
 def decrypt_data(encrypted_data: str) -> str:
     """解密数据"""
-    from cryptography.fernet import Fernet
-    key = ensure_secret_key()
-    fernet = Fernet(key)
     try:
-        decrypted = fernet.decrypt(encrypted_data.encode())
+        decrypted = _fernet().decrypt(encrypted_data.encode())
         return decrypted.decode()
     except Exception as e:
         logger.error(f"解密失败: {e}")
         raise ValueError("解密失败，请检查密钥")
 
 # ==================== 缓存系统 ====================
-_current_cache = {}
+# 缓存占用内存上限，超出时按最近最少使用顺序淘汰
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# 缓存键为 (任务名, API名)，多个任务并行执行时互不覆盖；值为 (DataFrame, 占用字节数)
+_current_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+def get_cached_data(task_name: str, api_name: str = "API1") -> Optional[pd.DataFrame]:
+    """获取指定任务的缓存数据"""
+    with _cache_lock:
+        entry = _current_cache.get((task_name, api_name))
+        if entry is None:
+            return None
+        _current_cache.move_to_end((task_name, api_name))
+        return entry[0]
+
+def set_cached_data(task_name: str, api_name: str, df: pd.DataFrame):
+    """设置指定任务的缓存数据，总占用超过上限时淘汰最久未使用的数据（至少保留本次写入）"""
+    global _cache_bytes
+    key = (task_name, api_name)
+    size = int(df.memory_usage(deep=False).sum())
+
+    with _cache_lock:
+        old_entry = _current_cache.pop(key, None)
+        if old_entry is not None:
+            _cache_bytes -= old_entry[1]
+        _current_cache[key] = (df, size)
+        _cache_bytes += size
+
+        while _cache_bytes > CACHE_MAX_BYTES and len(_current_cache) > 1:
+            evicted_key, (_, evicted_size) = _current_cache.popitem(last=False)
+            _cache_bytes -= evicted_size
+            logger.info(f"缓存超出上限，淘汰: {evicted_key[0]}/{evicted_key[1]}")
+
+def clear_cache(task_name: str = None):
+    """清空缓存，指定任务名时只清空该任务的缓存"""
+    global _cache_bytes
+    with _cache_lock:
+        if task_name is None:
+            _current_cache.clear()
+            _cache_bytes = 0
+            return
+        for key in [key for key in _current_cache if key[0] == task_name]:
+            _cache_bytes -= _current_cache.pop(key)[1]
 
-def get_cached_data(api_name: str = "API1") -> Optional[pd.DataFrame]:
-    """获取当前任务的缓存数据"""
-    return _current_cache.get(api_name)
+# ==================== 任务锁机制 ====================
+# 锁文件超过该时长（秒）视为过期
+LOCK_STALE_SECONDS = 3600
+FILE_ATTRIBUTE_HIDDEN = 0x2
 
-def set_cached_data(api_name: str, df: pd.DataFrame):
-    """设置当前任务的缓存数据"""
-    _current_cache[api_name] = df
+def _hide_path(path: Path):
+    """设置Windows隐藏属性，直接调用系统API而不启动attrib进程"""
+    if os.name == 'nt':
+        import ctypes
+        ctypes.windll.kernel32.SetFileAttributesW(str(path), FILE_ATTRIBUTE_HIDDEN)
 
-def clear_cache():
-    """清空缓存"""
-    _current_cache.clear()
+def _take_over_stale_lock(lock_file: Path) -> bool:
+    """接管过期锁：写好新锁后用os.replace原子替换，而不是先删除旧锁再创建
+
+    先删除会误删其他进程刚用O_EXCL创建的新锁，导致两个进程同时执行任务。
+    替换前再检查一次锁是否仍过期，替换后回读内容确认锁归属；锁已被释放时抛出FileNotFoundError
+    """
+    content = f"{os.getpid()}|{datetime.now()}"
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=lock_file.parent,
+                                     suffix='.tmp', delete=False) as f:
+        f.write(content)
+    try:
+        # 其他进程可能已经接管，锁文件刚被更新
+        if time.time() - lock_file.stat().st_mtime <= LOCK_STALE_SECONDS:
+            return False
+        os.replace(f.name, lock_file)
+    finally:
+        if os.path.exists(f.name):
+            os.unlink(f.name)
+    return lock_file.read_text(encoding='utf-8') == content
 
-# ==================== 任务锁机制 ====================
 def _manage_lock(task_name: str, acquire: bool = True) -> bool:
     """统一的锁管理函数"""
     _, EXTERNAL_DIR = get_paths()
     lock_file = EXTERNAL_DIR / "locks" / f"{task_name}.lock"
 
     if acquire:
-        # 获取锁
-        if lock_file.exists():
-            try:
-                # 检查是否过期（1小时）
-                if datetime.now() - datetime.fromtimestamp(lock_file.stat().st_mtime) > timedelta(hours=1):
-                    lock_file.unlink()
-                else:
+        # 获取锁：O_CREAT|O_EXCL 保证创建和检查是同一个原子操作，并发启动时只有一个进程成功
+        try:
+            lock_file.parent.mkdir(parents=True, exist_ok=True)
+            _hide_path(lock_file.parent)
+
+            for _ in range(2):
+                try:
+                    fd = os.open(str(lock_file), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    # 锁已存在，检查是否过期；过期则原子地接管，锁在此期间被释放时重试一次
+                    try:
+                        if (time.time() - lock_file.stat().st_mtime > LOCK_STALE_SECONDS
+                                and _take_over_stale_lock(lock_file)):
+                            logger.info(f"任务 {task_name} 的过期锁已接管")
+                            return True
+                    except FileNotFoundError:
+                        continue
                     logger.info(f"任务 {task_name} 已被锁定")
                     return False
-            except:
-                return False
 
-        try:
-            lock_file.parent.mkdir(parents=True, exist_ok=True)
-            if os.name == 'nt':  # Windows隐藏目录
-                subprocess.run(['attrib', '+H', str(lock_file.parent)], shell=True, capture_output=True)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(f"{os.getpid()}|{datetime.now()}")
+                logger.info(f"任务 {task_name} 锁定成功")
+                return True
 
-            lock_file.write_text(f"{os.getpid()}|{datetime.now()}", encoding='utf-8')
-            logger.info(f"任务 {task_name} 锁定成功")
-            return True
+            logger.info(f"任务 {task_name} 已被锁定")
+            return False
         except Exception as e:
             logger.error(f"锁定失败: {e}")
             return False
@@ -151,36 +270,29 @@ def release_lock(task_name: str) -> bool:
     return _manage_lock(task_name, acquire=False)
 
 # ==================== 占位符处理 ====================
-def replace_placeholders(text: str, task_name: str) -> str:
-    """替换文本中的占位符"""
-    today = date.today().strftime("%Y%m%d")
-    replacements = {
-        "{date}": today,
-        "{taskName}": task_name
-    }
+# 所有占位符合并为一个正则，每个字符串只需扫描一遍
+_PLACEHOLDER_RE = re.compile(r"\{(?:date|taskName)\}")
 
-    result = text
-    for placeholder, value in replacements.items():
-        result = result.replace(placeholder, value)
+def make_formatter(task_name: str) -> Callable[[str], str]:
+    """构建任务的占位符替换函数，日期和替换映射只计算一次，可对多个字符串重复使用
 
-    return result
-
-def _format_task_strings(texts: list, task_name: str) -> list:
-    """批量替换任务相关字符串中的占位符"""
-    today = date.today().strftime("%Y%m%d")
-    replacements = {
-        "{date}": today,
+    使用正则替换而不是 str.format_map：邮件正文是HTML，其中CSS等内容的花括号会被format误解析
+    """
+    mapping = {
+        "{date}": date.today().strftime("%Y%m%d"),
         "{taskName}": task_name
     }
+    replace = lambda m: mapping[m.group(0)]
+    return lambda text: _PLACEHOLDER_RE.sub(replace, text)
 
-    result = []
-    for text in texts:
-        formatted_text = text
-        for placeholder, value in replacements.items():
-            formatted_text = formatted_text.replace(placeholder, value)
-        result.append(formatted_text)
+def replace_placeholders(text: str, task_name: str) -> str:
+    """替换文本中的占位符"""
+    return make_formatter(task_name)(text)
 
-    return result
+def _format_task_strings(texts: list, task_name: str) -> list:
+    """批量替换任务相关字符串中的占位符"""
+    fmt = make_formatter(task_name)
+    return [fmt(text) for text in texts]
 
 class ChainedStream:
     """辅助类：用于连接预读取的chunk和原始流"""
@@ -211,33 +323,244 @@ class ChainedStream:
                 return result
         return self.stream.read(size)
 
+    def readinto(self, b):
+        """读取数据填充调用方提供的缓冲区，预读内容消费完后直接交给原始流"""
+        if not self.buffer and hasattr(self.stream, 'readinto'):
+            return self.stream.readinto(b)
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+# ==================== API熔断器 ====================
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+class CircuitState:
+    """单个API地址的熔断状态：连续失败后在退避时间内直接拒绝请求，退避时间指数增长"""
+    FAILURE_THRESHOLD = 3   # 连续失败多少次后打开熔断器
+    BASE_BACKOFF = 30.0     # 首次打开的退避时间（秒）
+    MAX_BACKOFF = 600.0     # 退避时间上限（秒）
+
+    def __init__(self, failures: int = 0, backoff: float = 0.0, open_until: float = 0.0,
+                 last_failure: float = 0.0):
+        self.failures = failures
+        self.backoff = backoff
+        self.open_until = open_until
+        self.last_failure = last_failure
+
+    def trip(self, url: str, retry_after: Optional[float] = None):
+        """记录一次失败，连续失败达到阈值时打开熔断器"""
+        now = time.time()
+        # 距上次失败（或熔断结束）已超过一个退避窗口，视为新的一轮，不再沿用很久以前的失败次数和退避时间
+        if now - max(self.last_failure, self.open_until) > max(self.backoff, self.BASE_BACKOFF):
+            self.failures = 0
+            self.backoff = 0.0
+        self.failures += 1
+        self.last_failure = now
+        if self.failures < self.FAILURE_THRESHOLD:
+            return
+        if retry_after is not None:
+            # 服务端明确给出了等待时间，直接采用，不再套用指数退避
+            delay = min(retry_after, self.MAX_BACKOFF)
+        else:
+            self.backoff = min(self.backoff * 2 if self.backoff else self.BASE_BACKOFF, self.MAX_BACKOFF)
+            delay = self.backoff
+        self.open_until = now + delay
+        logger.warning(f"熔断器打开: {url}，{delay:.0f} 秒内不再请求（连续失败 {self.failures} 次）")
+
+    def reset(self, url: str):
+        """请求成功，关闭熔断器"""
+        if self.failures:
+            logger.info(f"熔断器关闭: {url} 已恢复")
+        self.failures = 0
+        self.backoff = 0.0
+        self.open_until = 0.0
+        self.last_failure = 0.0
+
+# 熔断状态保存在外部目录中，GUI与--headless定时任务等多个进程共享同一份失败记录
+_BREAKERS: Dict[str, CircuitState] = {}
+_BREAKER_FILE_MTIME: Optional[int] = None
+_BREAKER_LOCK = threading.Lock()
+
+def _breaker_state_file() -> Path:
+    _, EXTERNAL_DIR = get_paths()
+    return EXTERNAL_DIR / "circuit_state.json"
+
+def _read_breaker_file() -> Dict[str, Dict]:
+    """读取状态文件，不存在或损坏时返回空字典"""
+    try:
+        return json.loads(_breaker_state_file().read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"读取熔断状态失败，忽略: {e}")
+        return {}
+
+def _get_breaker(url: str) -> CircuitState:
+    """获取URL对应的熔断状态，状态文件被其他进程更新后重新加载"""
+    global _BREAKERS, _BREAKER_FILE_MTIME
+    with _BREAKER_LOCK:
+        try:
+            mtime = _breaker_state_file().stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != _BREAKER_FILE_MTIME:
+            _BREAKER_FILE_MTIME = mtime
+            _BREAKERS = {key: CircuitState(**value) for key, value in _read_breaker_file().items()}
+        return _BREAKERS.setdefault(url, CircuitState())
+
+def _save_breaker(url: str, breaker: CircuitState):
+    """把单个URL的熔断状态合并进状态文件：重新读取后只更新该URL，不覆盖其他进程写入的记录"""
+    state_file = _breaker_state_file()
+    try:
+        with _BREAKER_LOCK:
+            state = _read_breaker_file()
+            if breaker.failures:
+                state[url] = vars(breaker)
+            else:
+                state.pop(url, None)
+            # 每次写入使用独立的临时文件，多个进程同时保存时互不干扰
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=state_file.parent,
+                                             prefix='.circuit_state.', suffix='.tmp', delete=False) as f:
+                json.dump(state, f, ensure_ascii=False)
+            try:
+                os.replace(f.name, state_file)
+            except OSError:
+                os.unlink(f.name)
+                raise
+    except Exception as e:
+        logger.warning(f"保存熔断状态失败: {e}")
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+# 共享的HTTP会话：同一主机的多次请求复用TCP/TLS连接，连接失败时自动重试（不重试已发出的请求）
+_HTTP_ADAPTER = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                            max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.5))
+_SESSION = requests.Session()
+_SESSION.mount('https://', _HTTP_ADAPTER)
+_SESSION.mount('http://', _HTTP_ADAPTER)
+
+def _post_with_breaker(url: str, **kwargs) -> requests.Response:
+    """带熔断保护的POST请求 - 熔断期间直接失败，不再等待网络超时"""
+    breaker = _get_breaker(url)
+    if breaker.open_until > time.time():
+        raise CircuitOpenError(f"熔断中，{breaker.open_until - time.time():.0f} 秒后重试: {url}")
+
+    try:
+        response = _SESSION.post(url, **kwargs)
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        # 流式响应需显式关闭，连接才能归还连接池
+        e.response.close()
+        # 只有服务端故障和限流才计入熔断，认证等客户端错误不计入
+        status = e.response.status_code
+        if status >= 500 or status == 429:
+            breaker.trip(url, _parse_retry_after(e.response.headers.get("Retry-After")))
+            _save_breaker(url, breaker)
+        raise
+    except requests.exceptions.RequestException:
+        breaker.trip(url)
+        _save_breaker(url, breaker)
+        raise
+
+    if breaker.failures:
+        breaker.reset(url)
+        _save_breaker(url, breaker)
+    return response
+
 # ==================== API数据获取 ====================
+# 流式响应预读取大小，较大的块可以摊薄每次读取的系统调用开销
+STREAM_PREFETCH_SIZE = 65536
+
+# 同一任务内并发请求的API数上限
+API_FETCH_MAX_WORKERS = 8
+
+# 唯一值占比低于该比例的文本列转为Categorical存储
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# pyarrow可用时，每累积该数量的记录转换为一个Arrow批次
+ARROW_BATCH_SIZE = 50000
+
+def _index_api_configs(task_config: Dict) -> Dict[str, Dict]:
+    """按API名称索引任务的API配置，同名时保留第一个"""
+    index = {}
+    for config in task_config.get("api_configs", []):
+        index.setdefault(config.get("name", "API1"), config)
+    return index
+
 def fetch_api_data(task_config: Dict, api_name: str = "API1", use_cache: bool = True) -> Optional[pd.DataFrame]:
     """从指定API获取数据 - 优化版：流式处理大数据，防止内存溢出（适用于不分页API）"""
+    api_config = _index_api_configs(task_config).get(api_name)
+    if not api_config:
+        logger.error(f"未找到API配置: {api_name}")
+        return None
+
+    return _fetch_api_dataframe(task_config, api_name, api_config, use_cache)
+
+def _fetch_api_dataframe(task_config: Dict, api_name: str, api_config: Dict, use_cache: bool) -> Optional[pd.DataFrame]:
+    """按已定位的API配置获取数据，优先使用缓存"""
     # 检查缓存
     if use_cache:
-        cached_df = get_cached_data(api_name)
+        cached_df = get_cached_data(task_config.get("name", ""), api_name)
         if cached_df is not None:
             logger.info(f"使用缓存的DataFrame: {api_name}")
             return cached_df
 
-    # 获取指定API配置
-    api_configs = task_config.get("api_configs", [])
-    api_config = None
-    for config in api_configs:
-        if config.get("name") == api_name:
-            api_config = config
-            break
+    max_records = api_config.get("max_records", 100000)  # 最大记录数限制
+    logger.info(f"开始请求API数据，最大记录数限制: {max_records}")
 
-    if not api_config:
-        logger.error(f"未找到API配置: {api_name}")
+    records_iter = fetch_api_records(api_config)
+    if records_iter is None:
         return None
 
+    # 使用流式处理函数；达到最大记录数提前停止时同样关闭响应
+    try:
+        return _process_stream_dataset(records_iter, task_config, api_name, max_records)
+    finally:
+        records_iter.close()
+
+class StreamRecords:
+    """流式记录迭代器：遍历结束或调用close()时关闭HTTP响应，连接归还连接池
+
+    响应由本对象直接持有，即使从未开始遍历，close()也能释放连接（生成器未启动时close()不会执行finally）
+    """
+    def __init__(self, response: requests.Response, items: Iterator[Dict]):
+        self.response = response
+        self.items = items
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Dict:
+        try:
+            return next(self.items)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        self.response.close()
+
+def fetch_api_records(api_config: Dict) -> Optional[StreamRecords]:
+    """请求API并返回原始记录的流式迭代器，不构建DataFrame（适用于只需遍历记录的场景）。
+    用完后应调用返回值的close()释放连接"""
+    api_name = api_config.get("name", "API1")
     url = api_config["url"]
     headers = api_config.get("headers", {})
     timeout = api_config.get("timeout", 120)  # 增加超时时间，处理大数据
     verify_ssl = api_config.get("verify_ssl", True)
-    max_records = api_config.get("max_records", 100000)  # 最大记录数限制
 
     # 直接使用headers，不再解密
     decrypted_headers = headers
@@ -245,58 +568,45 @@ def fetch_api_data(task_config: Dict, api_name: str = "API1", use_cache: bool =
     logger.info(f"正在从API获取数据: {url} ({api_name})")
 
     try:
-        logger.info(f"开始请求API数据，最大记录数限制: {max_records}")
-        
         # 使用流式请求
-        response = requests.post(
+        response = _post_with_breaker(
             url,
             headers=decrypted_headers,
             timeout=timeout,
             verify=verify_ssl,
             stream=True  # 开启流式模式
         )
-        response.raise_for_status()
 
-        # 预读取一小部分数据以检测结构和错误
-        # requests的raw是urllib3的HTTPResponse，通常支持read
-        first_chunk = response.raw.read(2048)
-        
-        # 检查是否是错误响应（通常错误响应很短且包含 success: false）
         try:
-            preview = first_chunk.decode('utf-8', errors='ignore')
-            clean_preview = ''.join(preview.split())
-            
-            # 如果看起来像错误响应
-            if '"success":false' in clean_preview or '"success":0' in clean_preview:
+            # 预读取一部分数据以检测结构和错误
+            # requests的raw是urllib3的HTTPResponse，通常支持read；需显式开启解压，gzip响应只在这里解码一次
+            response.raw.decode_content = True
+            first_chunk = response.raw.read(STREAM_PREFETCH_SIZE)
+        
+            # 用ijson事件扫描预读数据，确定记录路径并识别错误响应（通常错误响应很短且包含 success: false）
+            prefix, failed = _scan_stream_prefix(first_chunk)
+            if failed:
                 # 读取剩余部分以便完整解析
-                remaining = response.raw.read()
-                full_content = first_chunk + remaining
+                full_content = first_chunk + response.raw.read()
+                response.close()
                 try:
                     error_data = json.loads(full_content)
                     logger.error(f"API返回错误: {error_data.get('message', '未知错误')}")
                 except:
-                    logger.error(f"API返回错误且无法解析: {preview[:200]}...")
+                    logger.error(f"API返回错误且无法解析: {full_content[:200].decode('utf-8', errors='ignore')}...")
                 return None
-                
-        except Exception as e:
-            logger.warning(f"预检查响应失败，继续尝试解析: {e}")
 
-        # 构建链式流
-        stream = ChainedStream(first_chunk, response.raw)
-        
-        # 确定解析路径
-        # 默认假设是 value: [...]
-        prefix = 'value.item'
-        if '"value":{' in clean_preview or '"value":{"records":[' in clean_preview:
-            prefix = 'value.records.item'
-            
-        logger.info(f"使用流式解析，路径: {prefix}")
-        
-        # 创建生成器
-        records_iter = ijson.items(stream, prefix)
+            # 构建链式流
+            stream = ChainedStream(first_chunk, response.raw)
+
+            logger.info(f"使用流式解析，路径: {prefix}，解析后端: {_IJSON_BACKEND_NAME}")
         
-        # 使用流式处理函数
-        return _process_stream_dataset(records_iter, task_config, api_name, max_records)
+            # 创建生成器
+            return StreamRecords(response, _IJSON_BACKEND.items(stream, prefix))
+        except BaseException:
+            # 预读、结构扫描或构建迭代器出错时同样要关闭响应，连接才能归还连接池
+            response.close()
+            raise
         
     except requests.exceptions.RequestException as e:
         logger.error(f"API请求失败: {api_name} - {e}")
@@ -305,57 +615,91 @@ def fetch_api_data(task_config: Dict, api_name: str = "API1", use_cache: bool =
         logger.error(f"数据处理失败: {api_name} - {e}")
         return None
 
+def _scan_stream_prefix(first_chunk: bytes) -> Tuple[str, bool]:
+    """扫描预读数据的JSON事件，返回 (记录解析路径, 是否为错误响应)
+
+    支持 {"value": [...]} 与 {"value": {"records": [...]}} 两种结构，预读数据不完整时以已看到的结构为准
+    """
+    prefix = 'value.item'
+    try:
+        for path, event, value in _IJSON_BACKEND.parse(BytesIO(first_chunk)):
+            if path == 'success' and event in ('boolean', 'number') and not value:
+                return prefix, True
+            if path == 'value' and event == 'start_array':
+                return 'value.item', False
+            if path == 'value.records' and event == 'start_array':
+                return 'value.records.item', False
+            if path == 'value' and event == 'start_map':
+                prefix = 'value.records.item'
+    except ijson.JSONError:
+        pass
+    return prefix, False
+
 def _process_stream_dataset(records_iter, task_config: Dict, api_name: str, max_records: int) -> Optional[pd.DataFrame]:
-    """处理流式数据集 - 分批构建DataFrame"""
+    """处理流式数据集 - 按列累积记录，pyarrow可用时分批转换为Arrow表，最后一次性构建DataFrame"""
     logger.info(f"开始流式处理数据: {api_name}")
     
     try:
-        # 分批构建DataFrame以减少内存峰值
-        batch_size = 10000  # 每批10000条
-        dataframes = []
-        current_batch = []
+        # 按列累积（字段名 -> 值列表），不再逐批构建中间DataFrame再合并
+        progress_interval = 10000  # 每10000条输出一次进度
+        columns: Dict[str, List] = {}
+        batches = []  # 已转换的Arrow批次
+        batch_count = 0  # 当前按列累积的行数
         total_count = 0
-        
-        for record in records_iter:
-            current_batch.append(record)
+
+        records_iter = iter(records_iter)
+        first_record = next(records_iter, None)
+        if first_record is None:
+            logger.warning(f"未获取到任何数据: {api_name}")
+            return None
+        if not isinstance(first_record, dict):
+            # 记录不是对象（如标量或数组）时无法按字段累积，交给DataFrame构造函数处理
+            records = list(itertools.islice(itertools.chain([first_record], records_iter), max_records))
+            logger.info(f"记录不是JSON对象，直接构建DataFrame: {len(records)} 条")
+            return _finalize_dataframe(pd.DataFrame(records), task_config, api_name)
+
+        for record in itertools.chain([first_record], records_iter):
+            for key, value in record.items():
+                column = columns.get(key)
+                if column is None:
+                    # 新出现的字段，之前的行补None
+                    column = columns[key] = [None] * batch_count
+                elif len(column) < batch_count:
+                    # 之前若干行缺少该字段，补None
+                    column.extend([None] * (batch_count - len(column)))
+                column.append(value)
+            batch_count += 1
             total_count += 1
             
-            # 达到批次大小时处理
-            if len(current_batch) >= batch_size:
-                batch_df = pd.DataFrame(current_batch)
-                dataframes.append(batch_df)
-                current_batch = [] # 清空当前批次
-                
+            if total_count % progress_interval == 0:
                 logger.info(f"已处理数据: {total_count} 条")
-                
-                # 立即清理内存
-                import gc
-                gc.collect()
+
+            # 累积的Python对象转换为Arrow列式缓冲区后即可释放
+            if pa is not None and batch_count >= ARROW_BATCH_SIZE:
+                batches.append(_columns_to_batch(columns, batch_count))
+                columns = {}
+                batch_count = 0
                 
             # 检查最大记录数限制
             if total_count >= max_records:
                 logger.warning(f"达到最大记录数限制 ({max_records})，停止读取")
                 break
-        
-        # 处理剩余数据
-        if current_batch:
-            batch_df = pd.DataFrame(current_batch)
-            dataframes.append(batch_df)
-            logger.info(f"处理剩余数据，总计: {total_count} 条")
             
-        if not dataframes:
+        if not total_count:
             logger.warning(f"未获取到任何数据: {api_name}")
             return None
-            
-        # 合并所有批次
-        logger.info("开始合并数据批次...")
-        final_df = pd.concat(dataframes, ignore_index=True)
         
-        # 清理临时DataFrame
-        del dataframes
-        del current_batch
-        import gc
-        gc.collect()
+        logger.info(f"数据读取完成，总计: {total_count} 条，开始构建DataFrame...")
+        if batches:
+            if batch_count:
+                batches.append(_columns_to_batch(columns, batch_count))
+            del columns
+            final_df = _batches_to_dataframe(batches)
+        else:
+            _pad_columns(columns, batch_count)
+            final_df = _columns_to_dataframe(columns)
+            # 释放按列累积的临时数据（引用计数归零即回收，无需完整GC）
+            del columns
         
         return _finalize_dataframe(final_df, task_config, api_name)
         
@@ -363,6 +707,50 @@ def _process_stream_dataset(records_iter, task_config: Dict, api_name: str, max_
         logger.error(f"流式数据集处理失败: {api_name} - {e}")
         return None
 
+def _pad_columns(columns: Dict[str, List], row_count: int):
+    """末尾若干行缺少的字段补None，使各列等长"""
+    for column in columns.values():
+        if len(column) < row_count:
+            column.extend([None] * (row_count - len(column)))
+
+def _has_decimal(columns: Dict[str, List]) -> bool:
+    """是否含有Decimal值（ijson解析小数得到）。Arrow会将其统一为同一精度，
+    1变为1.0、1.5变为1.500，预览和导出中的数值显示随之改变，这类数据交由pandas处理"""
+    return any(Decimal in set(map(type, column)) for column in columns.values())
+
+def _columns_to_dataframe(columns: Dict[str, List]) -> pd.DataFrame:
+    """由按列累积的数据构建DataFrame，pyarrow可用时经Arrow列式表转换"""
+    if pa is not None and not _has_decimal(columns):
+        try:
+            # split_blocks/self_destruct：转换过程中逐列释放Arrow缓冲区，峰值内存约为一份数据
+            return pa.table(columns).to_pandas(split_blocks=True, self_destruct=True)
+        except (pa.ArrowException, OverflowError):
+            pass  # 同一列类型混杂、整数超出int64范围等情况，回退到pandas
+    return pd.DataFrame(columns)
+
+def _columns_to_batch(columns: Dict[str, List], row_count: int):
+    """将一批按列累积的数据转换为Arrow表，Arrow无法原样表示时退回为DataFrame"""
+    _pad_columns(columns, row_count)
+    if _has_decimal(columns):
+        return pd.DataFrame(columns)
+    try:
+        return pa.table(columns)
+    except (pa.ArrowException, OverflowError):
+        return pd.DataFrame(columns)
+
+def _batches_to_dataframe(batches: List) -> pd.DataFrame:
+    """合并各批次为DataFrame，批次间字段或类型不一致时按宽松规则统一"""
+    if all(isinstance(batch, pa.Table) for batch in batches):
+        try:
+            table = pa.concat_tables(batches, promote_options="permissive")
+            # 只保留合并后的表引用，self_destruct才能在转换时释放缓冲区
+            batches.clear()
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        except pa.ArrowException:
+            pass  # 批次间同一字段类型无法统一，逐批转换后由pandas合并
+    return pd.concat([batch.to_pandas() if isinstance(batch, pa.Table) else batch for batch in batches],
+                     ignore_index=True, sort=False)
+
 def _process_small_dataset(records: List, task_config: Dict, api_name: str) -> Optional[pd.DataFrame]:
     """处理小数据集 - 直接构建"""
     logger.info(f"小数据集直接处理: {len(records)} 条记录")
@@ -375,6 +763,32 @@ def _process_small_dataset(records: List, task_config: Dict, api_name: str) -> O
         logger.error(f"小数据集处理失败: {api_name} - {e}")
         return None
 
+def _downcast_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """压缩DataFrame内存：整数降为最小位宽，可无损表示的浮点降为float32，低基数文本列转为Categorical，
+    其余纯文本列在pyarrow可用时转为Arrow字符串"""
+    for column in df.columns:
+        series = df[column]
+        try:
+            if pd.api.types.is_integer_dtype(series):
+                df[column] = pd.to_numeric(series, downcast='integer')
+            elif pd.api.types.is_float_dtype(series):
+                # 只有全部数值都能被float32精确表示时才降位，避免Excel中出现精度误差
+                downcast = series.astype('float32')
+                if downcast.astype('float64').equals(series):
+                    df[column] = downcast
+            elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+                # pandas 3.x默认把文本列推断为str类型而非object，两者都要处理
+                if series.nunique(dropna=True) < len(series) * CATEGORY_MAX_UNIQUE_RATIO:
+                    df[column] = series.astype('category')
+                elif (pa is not None and pd.api.types.is_object_dtype(series)
+                      and pd.api.types.infer_dtype(series, skipna=True) == 'string'):
+                    # 高基数的纯文本列改用Arrow字符串存储，省去每个值一个Python str对象的开销
+                    df[column] = series.astype('string[pyarrow]')
+        except TypeError:
+            # 列表、字典等不可哈希的值无法转为Categorical，保持原样
+            continue
+    return df
+
 def _finalize_dataframe(df: pd.DataFrame, task_config: Dict, api_name: str) -> Optional[pd.DataFrame]:
     """最终DataFrame处理和验证"""
     try:
@@ -384,7 +798,10 @@ def _finalize_dataframe(df: pd.DataFrame, task_config: Dict, api_name: str) -> O
             df = df.drop_duplicates()
             if len(df) < initial_count:
                 logger.info(f"数据去重: {initial_count} -> {len(df)} 条记录")
-        
+
+            # 压缩列类型，缓存和后续输出都使用更小的DataFrame
+            df = _downcast_dataframe(df)
+
         logger.info(f"数据处理完成: {api_name}, 共 {len(df)} 行数据")
         
         # 数据校验
@@ -400,11 +817,7 @@ def _finalize_dataframe(df: pd.DataFrame, task_config: Dict, api_name: str) -> O
         logger.info(f"DataFrame内存使用: {memory_usage:.2f} MB")
         
         # 缓存结果
-        set_cached_data(api_name, df)
-        
-        # 最终内存清理
-        import gc
-        gc.collect()
+        set_cached_data(task_config.get("name", ""), api_name, df)
         
         return df
         
@@ -412,21 +825,96 @@ def _finalize_dataframe(df: pd.DataFrame, task_config: Dict, api_name: str) -> O
         logger.error(f"最终DataFrame处理失败: {api_name} - {e}")
         return None
 
-def fetch_all_api_data(task_config: Dict, use_cache: bool = True) -> Dict[str, Optional[pd.DataFrame]]:
-    """获取任务所有API的数据"""
-    api_configs = task_config.get("api_configs", [])
-    results = {}
-
-    for api_config in api_configs:
-        api_name = api_config.get("name", "API1")
-        df = fetch_api_data(task_config, api_name, use_cache)
-        results[api_name] = df
+def fetch_all_api_data(task_config: Dict, use_cache: bool = True,
+                       api_names: Optional[List[str]] = None) -> Dict[str, Optional[pd.DataFrame]]:
+    """获取任务所有API的数据（指定api_names时只获取这些API），多个API并发请求"""
+    api_index = _index_api_configs(task_config)
+    if api_names is not None:
+        api_index = {api_name: api_index[api_name] for api_name in api_names if api_name in api_index}
+    if len(api_index) <= 1:
+        return {api_name: _fetch_api_dataframe(task_config, api_name, api_config, use_cache)
+                for api_name, api_config in api_index.items()}
+
+    # 各API请求互相独立且以网络等待为主，并发执行后总耗时取决于最慢的一个
+    with ThreadPoolExecutor(max_workers=min(API_FETCH_MAX_WORKERS, len(api_index))) as executor:
+        futures = {
+            api_name: executor.submit(_fetch_api_dataframe, task_config, api_name, api_config, use_cache)
+            for api_name, api_config in api_index.items()
+        }
 
-    return results
+    # 按配置顺序返回，保证Sheet顺序不变
+    return {api_name: future.result() for api_name, future in futures.items()}
 
 # ==================== Excel文件生成 ====================
-def generate_excel_file_with_sheets(task_config: Dict, data_frames: Dict[str, pd.DataFrame]) -> Optional[str]:
-    """生成包含多个Sheet的Excel文件"""
+# xlsxwriter工作簿选项：constant_memory模式下每写完一行即刷出到临时文件，内存占用与行数无关
+XLSX_WORKBOOK_OPTIONS = {
+    "constant_memory": True,
+    "strings_to_urls": False,  # URL按普通文本写入，避免逐个创建超链接（且超链接数量有上限）
+    "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    "remove_timezone": True
+}
+
+# Sheet名称中的非法字符替换表
+_SHEET_XLATE = str.maketrans({'/': '-', '\\': '-', '?': '', '*': '-', ':': '-', '[': '(', ']': ')'})
+
+def _clean_sheet_name(name: str) -> str:
+    """清理Sheet名称：替换非法字符并截断到31个字符"""
+    return name.translate(_SHEET_XLATE)[:31]
+
+def _unique_sheet_name(name: str, used: set) -> str:
+    """Excel的Sheet名称不区分大小写，重名时追加(2)、(3)...，并保证仍不超过31个字符"""
+    candidate = name
+    suffix = 1
+    while candidate.lower() in used:
+        suffix += 1
+        tag = f"({suffix})"
+        candidate = name[:31 - len(tag)] + tag
+    used.add(candidate.lower())
+    return candidate
+
+def _excel_cell_value(value):
+    """把DataFrame单元格值转换为xlsxwriter可直接写入的类型"""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, float):
+        # NaN/inf 无法写入数值单元格，按空单元格处理
+        return value if math.isfinite(value) else None
+    if isinstance(value, (str, bool, datetime, date, Number)):
+        return value
+    return str(value)
+
+def _write_excel_sheets(target, sheet_names: List[str], data_frames: Dict[str, pd.DataFrame]):
+    """将多个DataFrame逐行写入Excel工作簿，target为文件路径或BytesIO
+
+    constant_memory模式只能按行顺序写入，因此不经过pandas的to_excel（按列输出单元格）
+    """
+
+    with xlsxwriter.Workbook(target, XLSX_WORKBOOK_OPTIONS) as workbook:
+        header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        used_names = set()
+
+        for i, (api_name, df) in enumerate(data_frames.items()):
+            if df is None or df.empty:
+                logger.warning(f"跳过空的DataFrame: {api_name}")
+                continue
+
+            # 获取对应的sheet名称，如果没有则使用默认名称
+            sheet_name = sheet_names[i] if i < len(sheet_names) else f"Sheet{i+1}"
+            # 确保sheet名称不超过31个字符且不包含非法字符
+            sheet_name = _clean_sheet_name(sheet_name)
+            # 配置的名称与默认名称（如 Sheet2）或彼此之间可能重复，add_worksheet遇到重名会报错
+            sheet_name = _unique_sheet_name(sheet_name, used_names)
+
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(column) for column in df.columns], header_format)
+            for row_index, row in enumerate(df.itertuples(index=False, name=None), start=1):
+                worksheet.write_row(row_index, 0, [_excel_cell_value(value) for value in row])
+
+            logger.info(f"Sheet '{sheet_name}' 写入成功: {len(df)} 行数据")
+
+def generate_excel_file_with_sheets(task_config: Dict, data_frames: Dict[str, pd.DataFrame],
+                                    sheet_names_override: Optional[List[str]] = None) -> Optional[str]:
+    """生成包含多个Sheet的Excel文件，sheet_names_override用于代替任务配置中的sheet名称"""
     task_name = task_config["name"]
     filename_pattern = task_config["data_config"]["filename_pattern"]
 
@@ -445,20 +933,11 @@ def generate_excel_file_with_sheets(task_config: Dict, data_frames: Dict[str, pd
         file_path = Path(f"\\\\?\\{file_path}")
 
     try:
-        # 使用ExcelWriter生成多Sheet Excel
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+        if sheet_names_override is not None:
+            sheet_names = sheet_names_override
+        else:
             sheet_names = task_config["data_config"].get("sheet_names", [])
-
-            for i, (api_name, df) in enumerate(data_frames.items()):
-                if df is not None and not df.empty:
-                    # 获取对应的sheet名称，如果没有则使用默认名称
-                    sheet_name = sheet_names[i] if i < len(sheet_names) else f"Sheet{i+1}"
-                    # 确保sheet名称不超过31个字符且不包含非法字符
-                    sheet_name = sheet_name[:31].replace('/', '-').replace('\\', '-').replace('?', '').replace('*', '-').replace('[', '(').replace(']', ')')
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    logger.info(f"Sheet '{sheet_name}' 写入成功: {len(df)} 行数据")
-                else:
-                    logger.warning(f"跳过空的DataFrame: {api_name}")
+        _write_excel_sheets(str(file_path), sheet_names, data_frames)
 
         file_size = file_path.stat().st_size / 1024  # KB
         logger.info(f"Excel文件生成成功: {filename} ({file_size:.1f} KB)，包含 {len(data_frames)} 个Sheet")
@@ -468,39 +947,126 @@ def generate_excel_file_with_sheets(task_config: Dict, data_frames: Dict[str, pd
         return None
 
 # ==================== Windows任务计划工具 ====================
+# 子进程不弹出控制台窗口（仅Windows有效）
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+# 星期代码 -> 任务计划XML元素名
+WEEKDAY_XML_NAMES = {
+    "MON": "Monday", "TUE": "Tuesday", "WED": "Wednesday", "THU": "Thursday",
+    "FRI": "Friday", "SAT": "Saturday", "SUN": "Sunday"
+}
+
+# 任务计划XML模板，通过 schtasks /Create /XML 一次性导入完整任务定义
+TASK_XML_TEMPLATE = Template("""<?xml version="1.0" encoding="UTF-16"?>
+<Task version="1.2" xmlns="http://schemas.microsoft.com/windows/2004/02/mit/task">
+  <RegistrationInfo>
+    <Description>$description</Description>
+  </RegistrationInfo>
+  <Triggers>
+    <CalendarTrigger>
+      <StartBoundary>$start_boundary</StartBoundary>
+      <Enabled>true</Enabled>
+      $schedule
+    </CalendarTrigger>
+  </Triggers>
+  <Settings>
+    <MultipleInstancesPolicy>IgnoreNew</MultipleInstancesPolicy>
+    <DisallowStartIfOnBatteries>false</DisallowStartIfOnBatteries>
+    <StopIfGoingOnBatteries>false</StopIfGoingOnBatteries>
+    <Enabled>true</Enabled>
+    <ExecutionTimeLimit>PT1H</ExecutionTimeLimit>
+  </Settings>
+  <Actions Context="Author">
+    <Exec>
+      <Command>$command</Command>
+      <Arguments>$arguments</Arguments>
+    </Exec>
+  </Actions>
+</Task>
+""")
+
+def _build_task_xml(task_name: str, frequency: str, time_str: str, day_of_week: str = None) -> str:
+    """根据模板生成任务计划XML"""
+    if getattr(sys, 'frozen', False):
+        exe_path = str(Path(sys.executable).resolve())
+    else:
+        exe_path = str(Path(__file__).parent / "app.py")
+
+    if frequency == "WEEKLY":
+        # 所有星期合并到同一个 DaysOfWeek 元素中
+        days = "".join(f"<{WEEKDAY_XML_NAMES[day.strip()]} />" for day in day_of_week.split(","))
+        schedule = f"<ScheduleByWeek><DaysOfWeek>{days}</DaysOfWeek><WeeksInterval>1</WeeksInterval></ScheduleByWeek>"
+    else:  # DAILY
+        schedule = "<ScheduleByDay><DaysInterval>1</DaysInterval></ScheduleByDay>"
+
+    return TASK_XML_TEMPLATE.substitute(
+        description=xml_escape(f"百川数据助手定时任务: {task_name}"),
+        start_boundary=f"{date.today().isoformat()}T{time_str}:00",
+        schedule=schedule,
+        command=xml_escape(exe_path),
+        arguments=xml_escape(f'--headless "{task_name}"')
+    )
+
+# 任务计划COM接口常量
+TASK_CREATE_OR_UPDATE = 6
+TASK_LOGON_INTERACTIVE_TOKEN = 3
+TASK_ENUM_HIDDEN = 1
+COM_FILE_NOT_FOUND = -2147024894  # HRESULT 0x80070002
+
+# IRegisteredTask.State -> 任务状态
+COM_TASK_STATES = {1: 'disabled', 2: 'ready', 3: 'ready', 4: 'running'}
+
+# COM对象只能在创建它的线程中使用，按线程缓存任务计划根目录
+_com_local = threading.local()
+
+def _get_task_folder():
+    """获取任务计划根目录COM对象，pywin32不可用或连接失败时返回None（回退到schtasks）"""
+    if win32com is None:
+        return None
+
+    folder = getattr(_com_local, 'folder', None)
+    if folder is None:
+        try:
+            pythoncom.CoInitialize()
+            scheduler = win32com.client.Dispatch('Schedule.Service')
+            scheduler.Connect()
+            folder = scheduler.GetFolder('\\')
+        except Exception as e:
+            logger.warning(f"连接任务计划服务失败，改用schtasks: {e}")
+            folder = False
+        _com_local.folder = folder
+
+    return folder or None
+
 def register_scheduled_task(task_name: str, frequency: str = "DAILY", time_str: str = "18:00", day_of_week: str = None) -> bool:
     """注册Windows定时任务（主入口函数）"""
+    xml_path = None
     try:
-        # 构建任务计划命令
-        _, EXTERNAL_DIR = get_paths()
-        if getattr(sys, 'frozen', False):
-            exe_path = str(Path(sys.executable).resolve())
-        else:
-            exe_path = str(Path(__file__).parent / "app.py")
-
-        task_command = f'"{exe_path}" --headless "{task_name}"'
         task_name_escaped = f"KW_{task_name.replace(' ', '_')}"
 
-        # 根据频率构建参数
-        if frequency == "WEEKLY":
-            if not day_of_week:
-                logger.error("注册每周任务时必须提供星期几")
-                return False
-            schedule_params = ['/SC', 'WEEKLY', '/D', day_of_week]
-        else:  # DAILY
-            schedule_params = ['/SC', 'DAILY']
+        if frequency == "WEEKLY" and not day_of_week:
+            logger.error("注册每周任务时必须提供星期几")
+            return False
+
+        task_xml = _build_task_xml(task_name, frequency, time_str, day_of_week)
+
+        folder = _get_task_folder()
+        if folder is not None:
+            folder.RegisterTask(task_name_escaped, task_xml, TASK_CREATE_OR_UPDATE, '', '', TASK_LOGON_INTERACTIVE_TOKEN)
+            logger.info(f"定时任务注册成功: {task_name} ({frequency} {time_str})")
+            return True
+
+        # 回退：写入临时XML文件后通过schtasks导入（schtasks要求UTF-16编码）
+        with tempfile.NamedTemporaryFile('w', suffix='.xml', encoding='utf-16', delete=False) as xml_file:
+            xml_file.write(task_xml)
+            xml_path = xml_file.name
 
         # 创建任务
-        create_cmd = [
-            'schtasks', '/Create', '/TN', task_name_escaped,
-            '/TR', task_command,
-            '/ST', time_str,
-            '/F'
-        ] + schedule_params
+        create_cmd = ['schtasks', '/Create', '/XML', xml_path, '/TN', task_name_escaped, '/F']
 
         logger.info(f"执行命令: {' '.join(create_cmd)}")
 
-        result = subprocess.run(create_cmd, capture_output=True, shell=True)
+        result = subprocess.run(create_cmd, capture_output=True, creationflags=CREATE_NO_WINDOW)
 
         try:
             stderr_text = result.stderr.decode('utf-8', errors='ignore') if isinstance(result.stderr, bytes) else str(result.stderr or '')
@@ -517,15 +1083,32 @@ def register_scheduled_task(task_name: str, frequency: str = "DAILY", time_str:
     except Exception as e:
         logger.error(f"注册定时任务时出错: {e}")
         return False
+    finally:
+        if xml_path:
+            try:
+                os.unlink(xml_path)
+            except OSError:
+                pass
 
 def get_task_status(task_name: str) -> str:
     """获取任务在Windows任务计划程序中的状态"""
     task_name_escaped = f"KW_{task_name.replace(' ', '_')}"
 
     try:
+        folder = _get_task_folder()
+        if folder is not None:
+            try:
+                return COM_TASK_STATES.get(folder.GetTask(task_name_escaped).State, 'unknown')
+            except pythoncom.com_error as e:
+                if e.hresult == COM_FILE_NOT_FOUND:
+                    return 'not_found'
+                # 拒绝访问，或任务计划服务重启后缓存的目录对象已失效：丢弃缓存，本次改用schtasks查询
+                logger.warning(f"通过COM查询任务状态失败，改用schtasks: {e}")
+                _com_local.folder = None
+
         # 查询任务状态
         result = subprocess.run(['schtasks', '/query', '/tn', task_name_escaped, '/fo', 'LIST'],
-                              capture_output=True, shell=True)
+                              capture_output=True, creationflags=CREATE_NO_WINDOW)
 
         if result.returncode == 0:
             try:
@@ -561,9 +1144,15 @@ def enable_scheduled_task(task_name: str) -> bool:
             logger.warning(f"任务不存在，无法启用: {task_name}")
             return False
 
+        folder = _get_task_folder()
+        if folder is not None:
+            folder.GetTask(task_name_escaped).Enabled = True
+            logger.info(f"定时任务启用成功: {task_name}")
+            return True
+
         # 启用任务
         enable_cmd = ['schtasks', '/change', '/tn', task_name_escaped, '/enable']
-        result = subprocess.run(enable_cmd, capture_output=True, shell=True)
+        result = subprocess.run(enable_cmd, capture_output=True, creationflags=CREATE_NO_WINDOW)
 
         try:
             stderr_text = result.stderr.decode('utf-8', errors='ignore') if isinstance(result.stderr, bytes) else str(result.stderr or '')
@@ -586,9 +1175,15 @@ def disable_scheduled_task(task_name: str) -> bool:
     task_name_escaped = f"KW_{task_name.replace(' ', '_')}"
 
     try:
+        folder = _get_task_folder()
+        if folder is not None:
+            folder.GetTask(task_name_escaped).Enabled = False
+            logger.info(f"定时任务禁用成功: {task_name}")
+            return True
+
         # 禁用任务
         disable_cmd = ['schtasks', '/change', '/tn', task_name_escaped, '/disable']
-        result = subprocess.run(disable_cmd, capture_output=True, shell=True)
+        result = subprocess.run(disable_cmd, capture_output=True, creationflags=CREATE_NO_WINDOW)
 
         try:
             stderr_text = result.stderr.decode('utf-8', errors='ignore') if isinstance(result.stderr, bytes) else str(result.stderr or '')
@@ -611,11 +1206,22 @@ def delete_scheduled_task(task_name: str) -> bool:
     task_name_escaped = f"KW_{task_name.replace(' ', '_')}"
 
     try:
+        folder = _get_task_folder()
+        if folder is not None:
+            try:
+                folder.DeleteTask(task_name_escaped, 0)
+                logger.info(f"定时任务删除成功: {task_name_escaped}")
+            except pythoncom.com_error as e:
+                if e.hresult != COM_FILE_NOT_FOUND:
+                    raise
+                logger.warning(f"尝试删除但未找到任务 (视为成功): {task_name_escaped}")
+            return True
+
         # 直接删除任务，使用 /F 强制删除
         delete_cmd = ['schtasks', '/delete', '/tn', task_name_escaped, '/f']
         logger.info(f"执行命令: {' '.join(delete_cmd)}")
 
-        result = subprocess.run(delete_cmd, capture_output=True, shell=True)
+        result = subprocess.run(delete_cmd, capture_output=True, creationflags=CREATE_NO_WINDOW)
 
         try:
             stderr_text = result.stderr.decode('utf-8', errors='ignore') if isinstance(result.stderr, bytes) else str(result.stderr or '')
@@ -637,38 +1243,33 @@ def delete_scheduled_task(task_name: str) -> bool:
         logger.error(f"删除定时任务时出错: {e}")
         return False
 
+# schtasks /query /fo LIST 输出中的任务名行，捕获去掉KW_前缀和_Wxxx星期后缀后的名称
+_SCHTASKS_NAME_RE = re.compile(r'^\s*TaskName:\s*\\?KW_([^\r\n]+?)(?:_W\w+)?\s*$', re.MULTILINE)
+
 def get_scheduled_tasks() -> List[str]:
     """获取所有KW_前缀的定时任务"""
     try:
+        folder = _get_task_folder()
+        if folder is not None:
+            # 去掉KW_前缀和可能的_Wxxx后缀，dict.fromkeys按出现顺序去重
+            return list(dict.fromkeys(
+                task.Name[3:].split('_W')[0]
+                for task in folder.GetTasks(TASK_ENUM_HIDDEN) if task.Name.startswith('KW_')
+            ))
+
         result = subprocess.run(
             ['schtasks', '/query', '/fo', 'LIST'],
-            capture_output=True, shell=True
+            capture_output=True, creationflags=CREATE_NO_WINDOW
         )
 
         if result.returncode == 0:
-            tasks = []
             # 安全地处理输出，避免编码问题
             try:
                 stdout_text = result.stdout.decode('utf-8', errors='ignore') if isinstance(result.stdout, bytes) else str(result.stdout or '')
             except:
                 stdout_text = str(result.stdout or '')
 
-            for line in stdout_text.split('\n'):
-                if 'KW_' in line:
-                    # 提取任务名
-                    if 'TaskName:' in line:
-                        try:
-                            task_name = line.split('TaskName:')[1].strip()
-                            if task_name.startswith('KW_'):
-                                # 去掉KW_前缀和可能的_Wxxx后缀
-                                base_name = task_name[3:]  # 去掉KW_
-                                if '_W' in base_name:
-                                    base_name = base_name.split('_W')[0]  # 去掉星期后缀
-                                if base_name not in tasks:
-                                    tasks.append(base_name)
-                        except:
-                            continue
-            return tasks
+            return list(dict.fromkeys(match.group(1) for match in _SCHTASKS_NAME_RE.finditer(stdout_text)))
         else:
             try:
                 stderr_text = result.stderr.decode('utf-8', errors='ignore') if isinstance(result.stderr, bytes) else str(result.stderr or '')
@@ -682,12 +1283,97 @@ def get_scheduled_tasks() -> List[str]:
         return []
 
 # ==================== 邮件发送工具 ====================
+import atexit
+import mmap
 import smtplib
+import mimetypes
+from contextlib import contextmanager
+from email.message import EmailMessage
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 from io import BytesIO
 
+# 超过该大小的附件通过mmap映射读取
+MMAP_ATTACHMENT_THRESHOLD = 10 * 1024 * 1024
+
+# SMTP连接池：每个 (服务器, 端口, 账号) 保留的空闲连接数、单连接最多发送的邮件数、连接超时（秒）
+SMTP_POOL_SIZE = 2
+SMTP_MAX_SENDS_PER_CONNECTION = 4000
+SMTP_TIMEOUT = 60
+
+class SMTPConnectionPool:
+    """SMTP连接池：复用已登录的SMTP_SSL连接，重试和连续发送时免去重复的TLS握手与登录"""
+    def __init__(self, max_idle: int = SMTP_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle: Dict[tuple, List] = {}  # 连接键 -> [(smtp, 已发送数), ...]
+        self._lock = threading.Lock()
+
+    def _acquire(self, key: tuple, password: str):
+        """取出一个可用连接：优先复用空闲连接（NOOP校验存活），否则新建并登录"""
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                smtp, sends = idle.pop()
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp, sends
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close(smtp)
+
+        server, port, user = key
+        smtp = smtplib.SMTP_SSL(server, port, timeout=SMTP_TIMEOUT)
+        try:
+            smtp.login(user, password)
+        except Exception:
+            self._close(smtp)
+            raise
+        return smtp, 0
+
+    def _release(self, key: tuple, smtp, sends: int):
+        """归还连接，超出发送上限或空闲连接已满时关闭"""
+        if sends < SMTP_MAX_SENDS_PER_CONNECTION:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append((smtp, sends))
+                    return
+        self._close(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        """关闭连接，QUIT失败时直接断开"""
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    @contextmanager
+    def connection(self, server: str, port: int, user: str, password: str):
+        """获取已登录的连接，正常结束时归还连接池，出错时关闭连接"""
+        key = (server, port, user)
+        smtp, sends = self._acquire(key, password)
+        try:
+            yield smtp
+        except Exception:
+            self._close(smtp)
+            raise
+        self._release(key, smtp, sends + 1)
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            connections = [smtp for idle in self._idle.values() for smtp, _ in idle]
+            self._idle.clear()
+        for smtp in connections:
+            self._close(smtp)
+
+_SMTP_POOL = SMTPConnectionPool()
+atexit.register(_SMTP_POOL.close_all)
+
 def send_email(task_config: Dict, data_frames: Dict[str, pd.DataFrame] = None, attachment_path: str = None) -> bool:
     """统一邮件发送函数 - 支持DataFrame直接发送或文件附件"""
 
@@ -695,6 +1381,20 @@ def send_email(task_config: Dict, data_frames: Dict[str, pd.DataFrame] = None, a
     sender_config = email_config["sender"]
     recipients = email_config["recipients"]
 
+    # 先做不需要任何开销的检查：收件人为空或附件缺失时直接返回，不再解密密码、生成附件和连接SMTP
+    to_list = recipients.get("to", [])
+    if not to_list:
+        logger.error("收件人列表为空，跳过发送")
+        return False
+
+    if not data_frames:
+        if not attachment_path:
+            logger.error("邮件发送失败：未提供数据或附件")
+            return False
+        if not Path(attachment_path).exists():
+            logger.error(f"附件文件不存在，跳过发送: {attachment_path}")
+            return False
+
     # 验证配置
     stored_password = sender_config.get("password", "")
     if not stored_password:
@@ -713,59 +1413,45 @@ def send_email(task_config: Dict, data_frames: Dict[str, pd.DataFrame] = None, a
         logger.error(f"密码解密失败: {e}")
         return False
 
-    to_list = recipients.get("to", [])
-    if not to_list:
-        logger.error("收件人列表为空")
-        return False
-
     # 批量处理占位符
-    task_name = task_config["name"]
+    fmt = make_formatter(task_config["name"])
+    subject = fmt(email_config["subject"])
+    attachment_name = fmt(email_config["attachment_name"])
     if data_frames:
-        # 使用DataFrame的情况
-        body = replace_sheet_variables(task_config, data_frames)
-        # 处理邮件正文中的 {taskName} 变量
-        body = replace_placeholders(body, task_name)
-        subject, attachment_name = _format_task_strings(
-            [email_config["subject"], email_config["attachment_name"]],
-            task_name
-        )
+        # 使用DataFrame的情况，表格变量替换后再处理邮件正文中的 {taskName} 等变量
+        body = fmt(replace_sheet_variables(task_config, data_frames))
         return _send_email_internal(task_config, subject, body,
                                    _create_excel_attachment(task_config, data_frames),
                                    attachment_name, sender_config, to_list,
                                    recipients.get("cc", []), recipients.get("bcc", []), password)
 
-    elif attachment_path:
+    else:
         # 使用文件附件的情况
-        body, subject, attachment_name = _format_task_strings(
-            [email_config["body"], email_config["subject"], email_config["attachment_name"]],
-            task_name
-        )
+        body = fmt(email_config["body"])
         # 再次处理邮件正文中的 {Sheet1} 等变量（如果有的话）
         # 这里不进行Sheet变量替换，因为只有DataFrame才处理Sheet变量
         return _send_email_with_file(task_config, subject, body, attachment_path,
                                    attachment_name, sender_config, to_list,
                                    recipients.get("cc", []), recipients.get("bcc", []), password)
 
-    else:
-        logger.error("邮件发送失败：未提供数据或附件")
-        return False
-
-def _create_excel_attachment(task_config: Dict, data_frames: Dict[str, pd.DataFrame]) -> bytes:
-    """创建Excel附件数据"""
+def _create_excel_attachment(task_config: Dict, data_frames: Dict[str, pd.DataFrame]) -> BytesIO:
+    """创建Excel附件数据，直接返回内存缓冲区以免复制整个工作簿"""
     buffer = BytesIO()
-
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        sheet_names = task_config["data_config"].get("sheet_names", [])
-
-        for i, (api_name, df) in enumerate(data_frames.items()):
-            if df is not None and not df.empty:
-                sheet_name = sheet_names[i] if i < len(sheet_names) else f"Sheet{i+1}"
-                # 清理sheet名称
-                sheet_name = sheet_name[:31].replace('/', '-').replace('\\', '-').replace('?', '').replace('*', '-').replace('[', '(').replace(']', ')')
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                logger.info(f"Sheet '{sheet_name}' 写入内存: {len(df)} 行数据")
-
-    return buffer.getvalue()
+    _write_excel_sheets(buffer, task_config["data_config"].get("sheet_names", []), data_frames)
+    return buffer
+
+# 邮件正文中的DataFrame预览HTML缓存，以对象id为键，DataFrame被回收时自动移除（重试发送时无需重新渲染）
+_html_preview_cache: Dict[int, str] = {}
+
+def _dataframe_preview_html(df: pd.DataFrame) -> str:
+    """生成DataFrame前10行的HTML表格"""
+    key = id(df)
+    html_table = _html_preview_cache.get(key)
+    if html_table is None:
+        html_table = df.head(10).to_html(index=False, escape=True)
+        _html_preview_cache[key] = html_table
+        weakref.finalize(df, _html_preview_cache.pop, key, None)
+    return html_table
 
 def replace_sheet_variables(task_config: Dict, data_frames: Dict[str, pd.DataFrame]) -> str:
     """替换邮件正文中的表格变量 - 支持多种变量名指向同一个数据框
@@ -779,7 +1465,8 @@ def replace_sheet_variables(task_config: Dict, data_frames: Dict[str, pd.DataFra
     body = task_config["email_config"]["body"]
     sheet_names = task_config["data_config"].get("sheet_names", [])
 
-    # 为每个数据框生成HTML表格，并支持多种变量名指向它
+    # 收集所有变量名到HTML表格的映射，最后对正文只做一次替换
+    alias_to_html = {}
     for i, (api_name, df) in enumerate(data_frames.items()):
         if df is not None and not df.empty:
             # 获取配置的sheet名称和默认名称
@@ -787,10 +1474,10 @@ def replace_sheet_variables(task_config: Dict, data_frames: Dict[str, pd.DataFra
             default_sheet_name = f"Sheet{i+1}"
 
             # 清理配置的sheet名称中的非法字符
-            clean_configured_name = configured_sheet_name[:31].replace('/', '-').replace('\\', '-').replace('?', '').replace('*', '-').replace('[', '(').replace(']', ')')
+            clean_configured_name = _clean_sheet_name(configured_sheet_name)
 
             # 生成HTML表格 - 所有变量名都指向同一个数据框
-            html_table = df.head(10).to_html(index=False, escape=True)
+            html_table = _dataframe_preview_html(df)
 
             # 支持多种变量名指向同一个数据框：
             # 这样用户可以使用任何一种变量名，都会被替换为同一个HTML表格
@@ -801,47 +1488,44 @@ def replace_sheet_variables(task_config: Dict, data_frames: Dict[str, pd.DataFra
                 f"{{Table{i+1}}}"                # 表格索引名称，如{Table1}
             ]
 
-            # 所有这些变量名都替换为同一个HTML表格
+            # 变量名冲突时以靠前的数据框为准
             for var_name in variable_names:
-                body = body.replace(var_name, html_table)
+                alias_to_html.setdefault(var_name, html_table)
+
+    if not alias_to_html:
+        return body
 
-    return body
+    # 较长的变量名优先匹配
+    pattern = re.compile("|".join(re.escape(name) for name in sorted(alias_to_html, key=len, reverse=True)))
+    return pattern.sub(lambda m: alias_to_html[m.group(0)], body)
 
-def _send_email_internal(task_config: Dict, subject: str, body: str, attachment_data: bytes,
+def _send_email_internal(task_config: Dict, subject: str, body: str, attachment_data: BytesIO,
                         attachment_name: str, sender_config: Dict, to_list: List, cc_list: List, bcc_list: List, password: str) -> bool:
     """内部邮件发送函数 - 使用内存数据"""
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-    from email.mime.application import MIMEApplication
-
     smtp_server = task_config.get("smtp_server", "smtp.chinatelecom.cn")
     smtp_port = task_config.get("smtp_port", 465)
 
     try:
         msg = MIMEMultipart()
+        msg.attach(MIMEText(body, 'html', 'utf-8'))
+
+        # getbuffer() 返回缓冲区的内存视图，base64编码时无需先复制一份字节串
+        attachment_view = attachment_data.getbuffer()
+        attachment = MIMEApplication(attachment_view, _subtype='xlsx')
+        attachment.add_header('Content-Disposition', 'attachment', filename=attachment_name)
+        msg.attach(attachment)
+        logger.info(f"使用内存数据作为附件: {attachment_view.nbytes} bytes")
+
         msg['Subject'] = subject
         msg['From'] = sender_config["email"]
         msg['To'] = ','.join(to_list)
         if cc_list:
             msg['Cc'] = ','.join(cc_list)
 
-        # 添加正文
-        body_mime = MIMEText(body, 'html', 'utf-8')
-        msg.attach(body_mime)
-
-        # 添加附件
-        if attachment_data:
-            attachment = MIMEApplication(attachment_data, _subtype='xlsx')
-            attachment.add_header('Content-Disposition', 'attachment', filename=attachment_name)
-            msg.attach(attachment)
-            logger.info(f"使用内存数据作为附件: {len(attachment_data)} bytes")
-
-        # 发送邮件
-        with smtplib.SMTP_SSL(smtp_server, smtp_port) as smtp:
-            smtp.login(sender_config["email"], password)
+        # 发送邮件（send_message直接按字节序列化，不再生成完整的字符串副本）
+        with _SMTP_POOL.connection(smtp_server, smtp_port, sender_config["email"], password) as smtp:
             all_recipients = to_list + cc_list + bcc_list
-            smtp.sendmail(sender_config["email"], all_recipients, msg.as_string())
+            smtp.send_message(msg, from_addr=sender_config["email"], to_addrs=all_recipients)
 
         logger.info(f"邮件发送成功，收件人: {len(to_list)}人, 抄送: {len(cc_list)}人")
         return True
@@ -850,19 +1534,27 @@ def _send_email_internal(task_config: Dict, subject: str, body: str, attachment_
         logger.error(f"邮件发送失败: {e}")
         return False
 
+def _attach_file(msg: EmailMessage, attachment_path: str, attachment_name: str):
+    """将文件作为附件加入邮件，大文件通过mmap视图直接编码，不先复制为bytes"""
+    mime_type, _ = mimetypes.guess_type(attachment_name)
+    maintype, subtype = (mime_type or 'application/octet-stream').split('/', 1)
+
+    with open(attachment_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > MMAP_ATTACHMENT_THRESHOLD:
+            # add_attachment会立即完成base64编码，之后即可释放视图和映射
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                msg.add_attachment(view, maintype=maintype, subtype=subtype, filename=attachment_name)
+        else:
+            msg.add_attachment(f.read(), maintype=maintype, subtype=subtype, filename=attachment_name)
+
 def _send_email_with_file(task_config: Dict, subject: str, body: str, attachment_path: str,
                          attachment_name: str, sender_config: Dict, to_list: List, cc_list: List, bcc_list: List, password: str) -> bool:
     """内部邮件发送函数 - 使用文件附件"""
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-    from email.mime.application import MIMEApplication
-
     smtp_server = task_config.get("smtp_server", "smtp.chinatelecom.cn")
     smtp_port = task_config.get("smtp_port", 465)
 
     try:
-        msg = MIMEMultipart()
+        msg = EmailMessage()
         msg['Subject'] = subject
         msg['From'] = sender_config["email"]
         msg['To'] = ','.join(to_list)
@@ -870,22 +1562,16 @@ def _send_email_with_file(task_config: Dict, subject: str, body: str, attachment
             msg['Cc'] = ','.join(cc_list)
 
         # 添加正文
-        body_mime = MIMEText(body, 'html', 'utf-8')
-        msg.attach(body_mime)
+        msg.set_content(body, subtype='html', charset='utf-8', cte='base64')
 
         # 添加文件附件
-        if Path(attachment_path).exists():
-            with open(attachment_path, 'rb') as f:
-                attachment = MIMEApplication(f.read(), _subtype='xlsx')
-                attachment.add_header('Content-Disposition', 'attachment', filename=attachment_name)
-                msg.attach(attachment)
-            logger.info(f"使用文件作为附件: {attachment_path}")
-
-        # 发送邮件
-        with smtplib.SMTP_SSL(smtp_server, smtp_port) as smtp:
-            smtp.login(sender_config["email"], password)
+        _attach_file(msg, attachment_path, attachment_name)
+        logger.info(f"使用文件作为附件: {attachment_path}")
+
+        # 发送邮件（send_message直接按字节序列化，不再生成完整的字符串副本）
+        with _SMTP_POOL.connection(smtp_server, smtp_port, sender_config["email"], password) as smtp:
             all_recipients = to_list + cc_list + bcc_list
-            smtp.sendmail(sender_config["email"], all_recipients, msg.as_string())
+            smtp.send_message(msg, from_addr=sender_config["email"], to_addrs=all_recipients)
 
         logger.info(f"邮件发送成功，收件人: {len(to_list)}人, 抄送: {len(cc_list)}人")
         return True
@@ -896,26 +1582,14 @@ def _send_email_with_file(task_config: Dict, subject: str, body: str, attachment
 
 def generate_excel_file(df: pd.DataFrame, task_config: Dict) -> Optional[str]:
     """生成Excel文件（向后兼容，单Sheet）"""
-    # 调用新的多Sheet函数，但只传递一个DataFrame
-    task_name = task_config["name"]
+    # 调用新的多Sheet函数，但只传递一个DataFrame，只取第一个sheet名称
     sheet_names = task_config["data_config"].get("sheet_names", ["Sheet1"])
-    data_frames = {"API1": df}
-
-    # 临时修改配置，确保向后兼容
-    original_sheet_names = task_config["data_config"].get("sheet_names", ["Sheet1"])
-    task_config["data_config"]["sheet_names"] = sheet_names[:1]  # 只取第一个sheet名称
-
-    try:
-        result = generate_excel_file_with_sheets(task_config, data_frames)
-        return result
-    finally:
-        # 恢复原始配置
-        task_config["data_config"]["sheet_names"] = original_sheet_names
+    return generate_excel_file_with_sheets(task_config, {"API1": df}, sheet_names_override=sheet_names[:1])
 
 # ==================== 配置常量 ====================
 DEFAULT_CONFIG_TEMPLATE = {
     "version": "1.0.0",
-    "tasks": [],
+    "tasks": {},  # 任务名 -> 任务配置
     "settings": {
         "default_smtp_server": "smtp.chinatelecom.cn",
         "default_smtp_port": 465,
@@ -958,33 +1632,63 @@ TASK_TEMPLATE = {
     "status": "active"
 }
 
+# 任务模板的JSON序列化副本：反序列化即得到独立的深拷贝，比copy.deepcopy更快
+_TASK_TEMPLATE_JSON = json.dumps(TASK_TEMPLATE, ensure_ascii=False)
+
+def new_task_config() -> Dict:
+    """基于任务模板创建新的任务配置（修改不会影响模板本身）"""
+    return json.loads(_TASK_TEMPLATE_JSON)
+
+_DEFAULT_CONFIG_JSON = json.dumps(DEFAULT_CONFIG_TEMPLATE, ensure_ascii=False)
+
+def _default_config() -> Dict:
+    """基于默认配置模板创建新的配置（修改不会影响模板本身）"""
+    return json.loads(_DEFAULT_CONFIG_JSON)
+
 # ==================== 配置管理工具 ====================
+# 配置文件读写锁，多个任务并行执行时避免同时写入
+_CONFIG_LOCK = threading.Lock()
+
+# 已解析的配置缓存，文件修改时间（纳秒）未变时不再重新读取和解析
+_config_cache = {"mtime": None, "data": None}
+
 def load_config() -> Dict:
-    """加载配置文件"""
+    """加载配置文件（返回副本，调用方可自由修改）"""
     _, EXTERNAL_DIR = get_paths()
     CONFIG_FILE = EXTERNAL_DIR / "config.json"
 
-    if not CONFIG_FILE.exists():
-        return DEFAULT_CONFIG_TEMPLATE.copy()
+    try:
+        mtime = CONFIG_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return _default_config()
 
     try:
-        config_data = json.loads(CONFIG_FILE.read_text(encoding='utf-8'))
-        # 确保配置结构完整
-        for key, value in DEFAULT_CONFIG_TEMPLATE.items():
-            if key not in config_data:
-                config_data[key] = value
-        return config_data
+        with _CONFIG_LOCK:
+            if _config_cache["mtime"] != mtime:
+                config_data = json.loads(CONFIG_FILE.read_text(encoding='utf-8'))
+                # 确保配置结构完整
+                for key, value in _default_config().items():
+                    config_data.setdefault(key, value)
+                # 向后兼容性：旧版本的tasks为列表，转换为以任务名为键的字典
+                if isinstance(config_data["tasks"], list):
+                    config_data["tasks"] = {task["name"]: task for task in config_data["tasks"]}
+                _config_cache.update(mtime=mtime, data=config_data)
+            return copy.deepcopy(_config_cache["data"])
     except Exception as e:
         logger.error(f"加载配置失败: {e}")
-        return DEFAULT_CONFIG_TEMPLATE.copy()
+        return _default_config()
 
 def save_config(config: Dict):
-    """保存配置文件"""
+    """保存配置文件（先写临时文件再替换，避免写入中断导致配置损坏）"""
     _, EXTERNAL_DIR = get_paths()
     CONFIG_FILE = EXTERNAL_DIR / "config.json"
+    temp_file = CONFIG_FILE.with_suffix('.json.tmp')
 
     try:
-        CONFIG_FILE.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding='utf-8')
+        with _CONFIG_LOCK:
+            temp_file.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding='utf-8')
+            os.replace(temp_file, CONFIG_FILE)
+            _config_cache.update(mtime=CONFIG_FILE.stat().st_mtime_ns, data=copy.deepcopy(config))
         logger.info("配置保存成功")
     except Exception as e:
         logger.error(f"保存配置失败: {e}")
@@ -993,10 +1697,7 @@ def save_config(config: Dict):
 def get_task_config(task_name: str) -> Optional[Dict]:
     """获取指定任务配置"""
     config = load_config()
-    for task in config.get("tasks", []):
-        if task.get("name") == task_name:
-            return task
-    return None
+    return config.get("tasks", {}).get(task_name)
 
 def add_task_config(task_config: Dict):
     """添加新任务配置"""
@@ -1016,13 +1717,8 @@ def add_task_config(task_config: Dict):
     if "data_config" in task_config and "sheet_names" not in task_config["data_config"]:
         task_config["data_config"]["sheet_names"] = ["Sheet1"]
 
-    # 检查任务名是否已存在
-    for i, task in enumerate(config["tasks"]):
-        if task["name"] == task_config["name"]:
-            config["tasks"][i] = task_config
-            break
-    else:
-        config["tasks"].append(task_config)
+    # 任务名已存在则覆盖，否则新增
+    config["tasks"][task_config["name"]] = task_config
 
     save_config(config)
 
@@ -1047,20 +1743,23 @@ def execute_task(task_name: str) -> bool:
         return False
 
     try:
-        # 1. 获取API数据（带重试）
-        data_frames = None
+        # 1. 获取API数据（带重试，重试时只重新获取失败的API）
+        data_frames = {}
+        missing = None  # 获取失败的API名称，None表示全部获取
         for attempt in range(3):
             try:
-                data_frames = fetch_all_api_data(task_config, use_cache=True)
-                if data_frames and not any(df is None for df in data_frames.values()):
+                data_frames.update(fetch_all_api_data(task_config, use_cache=True, api_names=missing))
+                missing = [api_name for api_name, df in data_frames.items() if df is None]
+                if data_frames and not missing:
                     break
+                logger.warning(f"第 {attempt + 1} 次数据获取不完整，失败的API: {missing}")
             except Exception as e:
                 logger.warning(f"第 {attempt + 1} 次数据获取失败: {e}")
-                if attempt < 2:
-                    logger.info("等待5秒后重试...")
-                    time.sleep(5)
+            if attempt < 2:
+                logger.info("等待5秒后重试...")
+                time.sleep(5)
 
-        if not data_frames or any(df is None for df in data_frames.values()):
+        if not data_frames or missing:
             logger.error(f"任务 {task_name} 数据获取失败")
             return False
 
@@ -1089,7 +1788,7 @@ def execute_task(task_name: str) -> bool:
         return False
     finally:
         release_lock(task_name)
-        clear_cache()
+        clear_cache(task_name)
 
 # ==================== 其他工具函数 ====================
 def unregister_scheduled_task(task_name: str) -> bool:
@@ -1100,10 +1799,9 @@ def unregister_scheduled_task(task_name: str) -> bool:
     if status == 'not_found':
         # 任务不存在，直接更新配置
         config = load_config()
-        for task_config in config.get("tasks", []):
-            if task_config["name"] == task_name:
-                task_config["schedule_config"]["enabled"] = False
-                break
+        task_config = config.get("tasks", {}).get(task_name)
+        if task_config:
+            task_config["schedule_config"]["enabled"] = False
         save_config(config)
         return True
     elif status == 'disabled':
@@ -1127,6 +1825,17 @@ def run_headless(task_name: str):
         logger.error(f"Headless任务 {task_name} 失败")
         return 1
 
+def run_headless_batch(task_names: List[str]) -> int:
+    """Headless模式运行多个任务 - 各任务相互独立，并行执行"""
+    if len(task_names) == 1:
+        return run_headless(task_names[0])
+
+    logger.info(f"Headless模式并行执行 {len(task_names)} 个任务")
+    with ThreadPoolExecutor(max_workers=min(8, len(task_names))) as executor:
+        results = list(executor.map(run_headless, task_names))
+
+    return 0 if all(result == 0 for result in results) else 1
+
 # ==================== 导入logger以供工具函数使用 ====================
 # 在app.py中会设置logger
 logger = None
@@ -1134,4 +1843,4 @@ logger = None
 def set_logger(logger_instance):
     """设置logger实例"""
     global logger
-    logger = logger_instance
\ No newline at end of file
+    logger = logger_instance